@@ -6,9 +6,16 @@ import urllib.parse
 import shutil
 import uuid
 import base64
+import struct
+import io
 import threading
+import heapq
+from collections import deque
+import itertools
 import subprocess
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import contextlib
+import functools
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed, wait
 from dotenv import load_dotenv
 from tqdm import tqdm
 from curl_cffi import requests as cffi_requests
@@ -40,6 +47,9 @@ if not os.path.isfile('.env'):
 load_dotenv()
 
 TOKEN_CACHE_FILE = "token_cache.json"
+TRACE_FILE = os.getenv('TRACE_FILE') or None
+THROUGHPUT_FILE = "throughput.json"
+THROUGHPUT_HISTORY = 10
 TURNSTILE_URL = "https://privacy.com.br"
 TURNSTILE_SITEKEY = "0x4AAAAAACDFv8IsPDbdsS-x"
 TQDM_FORMAT = "{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt}"
@@ -48,6 +58,129 @@ DOWNLOAD_CHUNK_SIZE = 64 * 1024
 
 MAX_WORKERS_MEDIA = 8
 MAX_WORKERS_HLS = 16
+MAX_WORKERS_FFMPEG = max(1, os.cpu_count() or 1)
+
+SCRATCH_DIR = os.getenv('SCRATCH_DIR') or None
+MIN_FREE_DISK_BYTES = int(os.getenv('MIN_FREE_SPACE_MB', '1024')) * 1024 * 1024
+DEFAULT_SEGMENT_BYTES = 2 * 1024 * 1024
+
+ESTIMATED_IMAGE_BYTES = 512 * 1024
+ESTIMATED_MP4_BYTES = 200 * 1024 * 1024
+ESTIMATED_HLS_BYTES = 400 * 1024 * 1024
+LARGE_JOB_BYTES = 16 * 1024 * 1024
+
+SEGMENTED_MIN_BYTES = int(os.getenv('SEGMENTED_MIN_MB', '64')) * 1024 * 1024
+SEGMENTED_PARTS = int(os.getenv('SEGMENTED_PARTS', '4'))
+
+MANIFEST_FILE = ".manifest.json"
+PART_SUFFIX = ".part"
+CHECKPOINT_INTERVAL = 10
+DISCOVERY_MAX_AGE = 30 * 60
+
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'files').lower()
+PACK_TEMP_SUFFIX = ".pack.jpg"
+PACK_SYNC_ENTRIES = 64
+PACK_SYNC_INTERVAL = 5
+
+HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', '95'))
+HEDGE_MAX_RATIO = float(os.getenv('HEDGE_MAX_RATIO', '0.05'))
+HEDGE_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+HEDGE_SUFFIX = ".hedge"
+MAX_WORKERS_VERIFY = 32
+IMAGE_TAIL_BYTES = 64 * 1024
+JPEG_TRAILER_BYTES = 1024
+VERIFY_REMOTE_SIZE = os.getenv('VERIFY_REMOTE_SIZE', 'false').lower() in ['true', '1', 'yes']
+CORRUPT_SUFFIX = ".corrupt"
+
+
+class Tracer:
+    def __init__(self, path=None):
+        self.path = path
+        self.enabled = bool(path)
+        self._events = []
+        self._threads = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+        self._origin = time.perf_counter()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def current(self):
+        if not self.enabled:
+            return None
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    def span(self, name, parent=None, **args):
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._span(name, parent, args)
+
+    @contextlib.contextmanager
+    def _span(self, name, parent, args):
+        stack = self._stack()
+        if parent is None and stack:
+            parent = stack[-1]
+        span_id = next(self._ids)
+        stack.append(span_id)
+        started = time.perf_counter()
+        try:
+            yield span_id
+        finally:
+            ended = time.perf_counter()
+            stack.pop()
+            thread = threading.current_thread()
+            event = {
+                "name": name,
+                "cat": name.split('.', 1)[0],
+                "ph": "X",
+                "ts": (started - self._origin) * 1e6,
+                "dur": (ended - started) * 1e6,
+                "pid": os.getpid(),
+                "tid": thread.ident,
+                "args": dict(args, id=span_id, parent=parent),
+            }
+            with self._lock:
+                self._events.append(event)
+                self._threads[thread.ident] = thread.name
+
+    def wrap(self, fn, name, **args):
+        if not self.enabled:
+            return fn
+        parent = self.current()
+
+        @functools.wraps(fn)
+        def traced(*a, **kw):
+            with self.span(name, parent=parent, **args):
+                return fn(*a, **kw)
+        return traced
+
+    def save(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        pid = os.getpid()
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in threads.items()
+        ]
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f)
+            tqdm.write(f"Trace salvo em {self.path}")
+        except Exception as e:
+            tqdm.write(f"{RED}Falha ao salvar trace: {e}{RESET}")
+
+
+TRACER = Tracer(TRACE_FILE)
 
 
 class TurnstileResolver:
@@ -182,6 +315,246 @@ class TokenCache:
             os.remove(self.cache_file)
 
 
+class ThroughputLog:
+    def __init__(self, log_file=THROUGHPUT_FILE):
+        self.log_file = log_file
+        self.runs = []
+
+    def load(self):
+        if not os.path.isfile(self.log_file):
+            return []
+        try:
+            with open(self.log_file, 'r', encoding='utf-8') as f:
+                self.runs = json.load(f)
+        except Exception:
+            self.runs = []
+        return self.runs
+
+    def save(self):
+        try:
+            with open(self.log_file, 'w', encoding='utf-8') as f:
+                json.dump(self.runs, f, indent=2)
+        except Exception:
+            pass
+
+    def record(self, total_bytes, seconds):
+        self.load()
+        self.runs.append({"bytes": total_bytes, "seconds": seconds, "at": int(time.time())})
+        self.runs = self.runs[-THROUGHPUT_HISTORY:]
+        self.save()
+
+    def bytes_per_second(self):
+        self.load()
+        total_bytes = sum(run["bytes"] for run in self.runs)
+        total_seconds = sum(run["seconds"] for run in self.runs)
+        return total_bytes / total_seconds if total_seconds > 0 else None
+
+
+class RemuxPool:
+    def __init__(self, max_workers=MAX_WORKERS_FFMPEG):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ffmpeg")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.ffmpeg_seconds = 0.0
+
+    def submit(self, fn, *args):
+        with self._lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+        return self._executor.submit(self._run, TRACER.wrap(fn, "ffmpeg"), *args)
+
+    def _run(self, fn, *args):
+        with self._lock:
+            self.queued -= 1
+        started = time.monotonic()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self.completed += 1
+                self.ffmpeg_seconds += elapsed
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def summary(self):
+        with self._lock:
+            avg = self.ffmpeg_seconds / self.completed if self.completed else 0.0
+            return (f"Conversões FFmpeg: {self.completed}, tempo total {self.ffmpeg_seconds:.1f}s "
+                    f"(média {avg:.1f}s), fila máxima {self.max_queued}")
+
+
+class DiskReservation:
+    def __init__(self, budget, remaining=0):
+        self.budget = budget
+        self.remaining = remaining
+
+    def expect(self, total):
+        if total and total > 0:
+            self.budget.adjust(self, total - self.remaining)
+
+    def written(self, n):
+        if n > 0:
+            self.budget.adjust(self, -min(n, self.remaining))
+
+    def release(self):
+        self.budget.adjust(self, -self.remaining)
+
+
+class DiskBudget:
+    def __init__(self, paths, min_free=MIN_FREE_DISK_BYTES):
+        self.paths = [p for p in dict.fromkeys(paths) if p]
+        self.min_free = min_free
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def _free_bytes(self):
+        free = []
+        for path in self.paths:
+            try:
+                free.append(shutil.disk_usage(path).free)
+            except OSError:
+                pass
+        return min(free) if free else None
+
+    def admit(self, expected=0):
+        with self._cond:
+            while True:
+                free = self._free_bytes()
+                if free is None or free - self.in_flight - expected >= self.min_free:
+                    break
+                if self.in_flight == 0:
+                    if free < self.min_free:
+                        return None
+                    break
+                self._cond.wait(timeout=5)
+            self.in_flight += expected
+            return DiskReservation(self, expected)
+
+    def adjust(self, reservation, delta):
+        with self._cond:
+            delta = max(delta, -reservation.remaining)
+            reservation.remaining += delta
+            self.in_flight += delta
+            if delta < 0:
+                self._cond.notify_all()
+
+
+class HedgePolicy:
+    def __init__(self, percentile=HEDGE_PERCENTILE, max_ratio=HEDGE_MAX_RATIO,
+                 window=HEDGE_WINDOW, min_samples=HEDGE_MIN_SAMPLES):
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.window = window
+        self.min_samples = min_samples
+        self._samples = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def delay(self, host):
+        with self._lock:
+            self.requests += 1
+            samples = self._samples.get(host)
+            if self.max_ratio <= 0 or not samples or len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+        return ordered[int(self.percentile / 100 * (len(ordered) - 1))]
+
+    def observe(self, host, seconds):
+        with self._lock:
+            samples = self._samples.get(host)
+            if samples is None:
+                samples = self._samples[host] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def try_hedge(self):
+        with self._lock:
+            if self.hedges + 1 > self.max_ratio * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def hedge_won(self):
+        with self._lock:
+            self.hedge_wins += 1
+
+    def summary(self):
+        with self._lock:
+            return (f"Requisições duplicadas (hedge): {self.hedges} de {self.requests}, "
+                    f"{self.hedge_wins} terminaram antes da original")
+
+
+class PriorityScheduler:
+    def __init__(self, items, cost_fn, max_workers, reserved_small=None, large_threshold=LARGE_JOB_BYTES):
+        if reserved_small is None:
+            reserved_small = max(1, max_workers // 4)
+        self.max_workers = max_workers
+        self.large_slots = max(1, max_workers - reserved_small)
+        self._large_running = 0
+        self._stopped = False
+        self._lock = threading.Lock()
+        self._small = []
+        self._large = []
+        seq = itertools.count()
+        for item in items:
+            cost = cost_fn(item)
+            if cost >= large_threshold:
+                self._large.append((-cost, next(seq), item))
+            else:
+                self._small.append((cost, next(seq), item))
+        heapq.heapify(self._small)
+        heapq.heapify(self._large)
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+
+    def next(self):
+        with self._lock:
+            if self._stopped:
+                return None
+            if self._large and (self._large_running < self.large_slots or not self._small):
+                self._large_running += 1
+                return heapq.heappop(self._large)[2], True
+            if self._small:
+                return heapq.heappop(self._small)[2], False
+            return None
+
+    def done(self, is_large):
+        if is_large:
+            with self._lock:
+                self._large_running -= 1
+
+    def _worker(self, task):
+        while True:
+            job = self.next()
+            if job is None:
+                return
+            item, is_large = job
+            try:
+                task(item)
+            finally:
+                self.done(is_large)
+
+    def run(self, task):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = {pool.submit(self._worker, task) for _ in range(self.max_workers)}
+            try:
+                while pending:
+                    finished, pending = wait(pending, timeout=0.5)
+                    for f in finished:
+                        f.result()
+            except KeyboardInterrupt:
+                self.stop()
+                tqdm.write("\nCancelando... aguardando os downloads em andamento terminarem.")
+                raise
+
+
 class PrivacyScraper:
     def __init__(self):
         self.session = cffi_requests.Session()
@@ -211,23 +584,24 @@ class PrivacyScraper:
             return None
 
     def _apply_tokens(self, token_v1, token_v2):
-        self.token_v1 = token_v1
-        self.token_v2 = token_v2
-        if "__cf_bm" not in self.session.cookies.get_dict():
-            self.session.get("https://privacy.com.br/", impersonate="chrome120")
-        response = self.session.get(
-            f"https://privacy.com.br/strangler/Authorize?TokenV1={token_v1}&TokenV2={token_v2}",
-            headers={
-                "Host": "privacy.com.br",
-                "Referer": "https://privacy.com.br/auth?route=sign-in",
-                "Accept": "application/json, text/plain, */*",
-                "Sec-Fetch-Site": "same-origin",
-                "Sec-Fetch-Mode": "cors",
-                "Sec-Fetch-Dest": "empty",
-            },
-            impersonate="chrome120"
-        )
-        return response.status_code == 200
+        with TRACER.span("apply_tokens"):
+            self.token_v1 = token_v1
+            self.token_v2 = token_v2
+            if "__cf_bm" not in self.session.cookies.get_dict():
+                self.session.get("https://privacy.com.br/", impersonate="chrome120")
+            response = self.session.get(
+                f"https://privacy.com.br/strangler/Authorize?TokenV1={token_v1}&TokenV2={token_v2}",
+                headers={
+                    "Host": "privacy.com.br",
+                    "Referer": "https://privacy.com.br/auth?route=sign-in",
+                    "Accept": "application/json, text/plain, */*",
+                    "Sec-Fetch-Site": "same-origin",
+                    "Sec-Fetch-Mode": "cors",
+                    "Sec-Fetch-Dest": "empty",
+                },
+                impersonate="chrome120"
+            )
+            return response.status_code == 200
 
     def _response_needs_captcha(self, response):
         try:
@@ -250,20 +624,21 @@ class PrivacyScraper:
             payload["TurnstileToken"] = turnstile_token
             payload["TurnstileMode"] = "invisible"
 
-        response = self.session.post(
-            "https://service.privacy.com.br/auth/login",
-            data=json.dumps(payload),
-            headers={
-                'Host': 'service.privacy.com.br',
-                'Accept': 'application/json, text/plain, */*',
-                'Content-Type': 'application/json',
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36',
-                'Sec-GPC': '1',
-                'Origin': 'https://privacy.com.br',
-                'Referer': 'https://privacy.com.br/',
-            },
-            impersonate="chrome120"
-        )
+        with TRACER.span("login.request", captcha=bool(turnstile_token)):
+            response = self.session.post(
+                "https://service.privacy.com.br/auth/login",
+                data=json.dumps(payload),
+                headers={
+                    'Host': 'service.privacy.com.br',
+                    'Accept': 'application/json, text/plain, */*',
+                    'Content-Type': 'application/json',
+                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36',
+                    'Sec-GPC': '1',
+                    'Origin': 'https://privacy.com.br',
+                    'Referer': 'https://privacy.com.br/',
+                },
+                impersonate="chrome120"
+            )
         if response.status_code == 200:
             tokens = response.json()
             t1, t2 = tokens.get("tokenV1"), tokens.get("token")
@@ -284,20 +659,22 @@ class PrivacyScraper:
             return True
         if result == "captcha_required":
             tqdm.write("Servidor exigiu captcha, resolvendo...")
-            turnstile_token = self.turnstile.resolve()
+            with TRACER.span("captcha"):
+                turnstile_token = self.turnstile.resolve()
             if not turnstile_token:
                 return False
             return self._do_login_request(turnstile_token) is True
         return False
 
     def login(self):
-        cached = self.cache.get_token(self.email)
-        if cached:
-            if self._apply_tokens(cached["token_v1"], cached["token_v2"]):
-                self.token_expires_at = cached.get("expires_at")
-                return True
+        with TRACER.span("login"):
+            cached = self.cache.get_token(self.email)
+            if cached:
+                if self._apply_tokens(cached["token_v1"], cached["token_v2"]):
+                    self.token_expires_at = cached.get("expires_at")
+                    return True
 
-        return self._login_with_captcha_fallback()
+            return self._login_with_captcha_fallback()
 
     def refresh_token_if_needed(self):
         if not self.token_expires_at:
@@ -385,18 +762,19 @@ class PrivacyScraper:
     def get_video_token(self, file_id):
         if not self.token_v2:
             return None
-        response = self.session.post(
-            "https://service.privacy.com.br/media/video/token",
-            json={"file_id": file_id, "exp": 3600},
-            headers={
-                "Host": "service.privacy.com.br",
-                "Authorization": f"Bearer {self.token_v2}",
-                "Content-Type": "application/json",
-                "Origin": "https://privacy.com.br",
-                "Referer": "https://privacy.com.br/",
-            },
-            impersonate="chrome120"
-        )
+        with TRACER.span("video_token"):
+            response = self.session.post(
+                "https://service.privacy.com.br/media/video/token",
+                json={"file_id": file_id, "exp": 3600},
+                headers={
+                    "Host": "service.privacy.com.br",
+                    "Authorization": f"Bearer {self.token_v2}",
+                    "Content-Type": "application/json",
+                    "Origin": "https://privacy.com.br",
+                    "Referer": "https://privacy.com.br/",
+                },
+                impersonate="chrome120"
+            )
         return response.json() if response.status_code == 200 else None
 
     def strip_edits_from_image_url(self, image_url):
@@ -416,15 +794,448 @@ class PrivacyScraper:
             return image_url
 
 
+class LibraryManifest:
+    def __init__(self, profile_name):
+        self.path = os.path.join(f"./{profile_name}", MANIFEST_FILE)
+        self.sizes = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return self.sizes
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.sizes = json.load(f)
+        except Exception:
+            self.sizes = {}
+        return self.sizes
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = dict(self.sizes)
+            self._dirty = False
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+        except Exception:
+            pass
+
+    def _key(self, filename):
+        return os.path.relpath(filename, os.path.dirname(self.path)).replace(os.sep, '/')
+
+    def record(self, filename):
+        try:
+            size = os.path.getsize(filename)
+        except OSError:
+            return
+        with self._lock:
+            self.sizes[self._key(filename)] = size
+            self._dirty = True
+
+    def forget(self, filename):
+        with self._lock:
+            if self.sizes.pop(self._key(filename), None) is not None:
+                self._dirty = True
+
+    def expected_size(self, filename):
+        return self.sizes.get(self._key(filename))
+
+
+class PackStore:
+    def __init__(self, profile_name, name="fotos"):
+        self.pack_path = os.path.join(f"./{profile_name}", f"{name}.pack")
+        self.index_path = self.pack_path + ".idx"
+        self.index = {}
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def exists(self):
+        return os.path.isfile(self.index_path)
+
+    def load(self):
+        self.index = {}
+        if not self.exists():
+            return self
+        pack_size = os.path.getsize(self.pack_path) if os.path.isfile(self.pack_path) else 0
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get("deleted"):
+                    self.index.pop(entry["mediaId"], None)
+                elif entry["offset"] + entry["length"] <= pack_size:
+                    self.index[entry["mediaId"]] = (entry["offset"], entry["length"])
+        return self
+
+    def __contains__(self, media_id):
+        return media_id in self.index
+
+    def append(self, media_id, src_path):
+        os.makedirs(os.path.dirname(self.pack_path), exist_ok=True)
+        with self._lock, open(src_path, 'rb') as src:
+            with open(self.pack_path, 'ab') as pack:
+                offset = pack.seek(0, os.SEEK_END)
+                shutil.copyfileobj(src, pack, DOWNLOAD_CHUNK_SIZE)
+                length = pack.tell() - offset
+            with open(self.index_path, 'a', encoding='utf-8') as idx:
+                idx.write(json.dumps({"mediaId": media_id, "offset": offset, "length": length}) + "\n")
+            self.index[media_id] = (offset, length)
+            self._unsynced += 1
+            due = (self._unsynced >= PACK_SYNC_ENTRIES
+                   or time.monotonic() - self._last_sync >= PACK_SYNC_INTERVAL)
+        if due:
+            self.sync()
+
+    def sync(self):
+        with self._lock:
+            if not self._unsynced:
+                return
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+        with self._sync_lock:
+            for path in (self.pack_path, self.index_path):
+                if os.path.isfile(path):
+                    with open(path, 'ab') as f:
+                        os.fsync(f.fileno())
+
+    def forget(self, media_id):
+        with self._lock:
+            if self.index.pop(media_id, None) is None:
+                return
+            with open(self.index_path, 'a', encoding='utf-8') as idx:
+                idx.write(json.dumps({"mediaId": media_id, "deleted": True}) + "\n")
+            self._unsynced += 1
+
+    def restore(self, media_id, offset, length):
+        with self._lock:
+            with open(self.index_path, 'a', encoding='utf-8') as idx:
+                idx.write(json.dumps({"mediaId": media_id, "offset": offset, "length": length}) + "\n")
+            self.index[media_id] = (offset, length)
+            self._unsynced += 1
+
+    def read(self, media_id):
+        offset, length = self.index[media_id]
+        with open(self.pack_path, 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def export(self, dest_dir):
+        os.makedirs(dest_dir, exist_ok=True)
+        exported = 0
+        with open(self.pack_path, 'rb') as pack:
+            for media_id, (offset, length) in tqdm(
+                list(self.index.items()), desc="Exportando", bar_format=TQDM_FORMAT, leave=False
+            ):
+                target = os.path.join(dest_dir, f"{media_id}.jpg")
+                if os.path.exists(target):
+                    continue
+                pack.seek(offset)
+                with open(target + PART_SUFFIX, 'wb') as out:
+                    out.write(pack.read(length))
+                os.replace(target + PART_SUFFIX, target)
+                exported += 1
+        return exported
+
+
+class LibraryVerifier:
+    def __init__(self, profile_name, manifest, max_workers=MAX_WORKERS_VERIFY, pack=None, remote_size=None):
+        self.profile_name = profile_name
+        self.manifest = manifest
+        self.max_workers = max_workers
+        self.pack = pack
+        self.remote_size = remote_size
+
+    def _check_image(self, f, size):
+        if size < 4:
+            return "vazio"
+        head = f.read(12)
+        f.seek(max(0, size - IMAGE_TAIL_BYTES))
+        tail = f.read()
+        if head.startswith(b'\xff\xd8\xff'):
+            eoi = tail.rfind(b'\xff\xd9')
+            if eoi < 0 or len(tail[eoi + 2:].strip(b'\x00\xff')) > JPEG_TRAILER_BYTES:
+                return "JPEG truncado"
+            return None
+        if head.startswith(b'\x89PNG'):
+            return None if b'IEND' in tail else "PNG truncado"
+        if head.startswith(b'RIFF') and head[8:12] == b'WEBP':
+            return None if struct.unpack('<I', head[4:8])[0] + 8 <= size else "WEBP truncado"
+        if head.startswith(b'GIF8'):
+            return None if tail.endswith(b';') else "GIF truncado"
+        return "cabeçalho de imagem inválido"
+
+    def _read_box(self, f, end):
+        pos = f.tell()
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        box_size, box_type = struct.unpack('>I4s', header)
+        header_size = 8
+        if box_size == 1:
+            large = f.read(8)
+            if len(large) < 8:
+                return None
+            box_size = struct.unpack('>Q', large)[0]
+            header_size = 16
+        elif box_size == 0:
+            box_size = end - pos
+        if box_size < header_size:
+            return None
+        return box_type, pos, box_size, header_size
+
+    def _scan_moov(self, f, moov_start, moov_end):
+        duration, fragmented = None, False
+        f.seek(moov_start)
+        while f.tell() < moov_end:
+            box = self._read_box(f, moov_end)
+            if box is None:
+                break
+            box_type, pos, box_size, header_size = box
+            if box_type == b'mvex':
+                fragmented = True
+            elif box_type == b'mvhd':
+                version = f.read(4)[:1]
+                if version == b'\x01':
+                    data = f.read(28)
+                    if len(data) == 28:
+                        timescale, value = struct.unpack('>IQ', data[16:28])
+                        duration = value / timescale if timescale else None
+                else:
+                    data = f.read(16)
+                    if len(data) == 16:
+                        timescale, value = struct.unpack('>II', data[8:16])
+                        duration = value / timescale if timescale else None
+            f.seek(pos + box_size)
+        return duration, fragmented
+
+    def _check_mp4(self, f, size):
+        found_ftyp = False
+        fragmented = False
+        moov = None
+        f.seek(0)
+        while f.tell() < size:
+            box = self._read_box(f, size)
+            if box is None:
+                return "cabeçalho MP4 inválido"
+            box_type, pos, box_size, header_size = box
+            if pos + box_size > size:
+                return "MP4 truncado"
+            if box_type == b'ftyp':
+                found_ftyp = True
+            elif box_type == b'moov':
+                moov = (pos + header_size, pos + box_size)
+            elif box_type == b'moof':
+                fragmented = True
+            f.seek(pos + box_size)
+        if not found_ftyp:
+            return "ftyp ausente"
+        if moov is None:
+            return "moov ausente"
+        duration, has_mvex = self._scan_moov(f, *moov)
+        if duration is None:
+            return "mvhd ausente"
+        if duration <= 0 and not (fragmented or has_mvex):
+            return "duração inválida"
+        return None
+
+    def check_file(self, path):
+        try:
+            size = os.path.getsize(path)
+            expected = self.manifest.expected_size(path)
+            if expected is None and self.remote_size is not None:
+                expected = self.remote_size(path)
+            if expected is not None and expected != size:
+                return f"tamanho {size} != {expected}"
+            with open(path, 'rb') as f:
+                if path.endswith('.mp4'):
+                    return self._check_mp4(f, size)
+                return self._check_image(f, size)
+        except OSError as e:
+            return f"erro de leitura: {e}"
+
+    def check_pack_entry(self, media_id):
+        try:
+            data = self.pack.read(media_id)
+        except (OSError, KeyError) as e:
+            return f"erro de leitura: {e}"
+        return self._check_image(io.BytesIO(data), len(data))
+
+    def run_pack(self):
+        media_ids = list(self.pack.index)
+        bad = []
+        with tqdm(total=len(media_ids), desc="Verificando pack", bar_format=TQDM_FORMAT, leave=False) as pbar, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for media_id, reason in zip(media_ids, pool.map(self.check_pack_entry, media_ids)):
+                pbar.update(1)
+                if reason:
+                    bad.append((media_id, reason))
+        return len(media_ids), bad
+
+    def _iter_files(self):
+        for sub, ext in (("fotos", ".jpg"), ("videos", ".mp4")):
+            folder = f"./{self.profile_name}/{sub}"
+            if not os.path.isdir(folder):
+                continue
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name.endswith(ext):
+                        yield entry.path
+
+    def run(self):
+        paths = list(self._iter_files())
+        bad = []
+        with tqdm(total=len(paths), desc="Verificando biblioteca", bar_format=TQDM_FORMAT, leave=False) as pbar, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for path, reason in zip(paths, pool.map(self.check_file, paths)):
+                pbar.update(1)
+                if reason:
+                    bad.append((path, reason))
+        return len(paths), bad
+
+
+class MediaItem:
+    __slots__ = ("media_id", "kind", "url", "file_id", "source", "expected_size")
+
+    def __init__(self, media_id, kind, url, file_id=None, source=None, expected_size=None):
+        self.media_id = media_id
+        self.kind = kind
+        self.url = url
+        self.file_id = file_id
+        self.source = source
+        self.expected_size = expected_size
+
+    @property
+    def is_hls(self):
+        return self.kind == "video" and '.mp4' not in self.url
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: data.get(name) for name in cls.__slots__})
+
+
+class JobCheckpoint:
+    def __init__(self, profile_name, job_name, media_type):
+        self.path = os.path.join(f"./{profile_name}", f".job_{job_name}.json")
+        self.media_type = media_type
+        self.feeds = {}
+        self.pending = {}
+        self.completed = set()
+        self.discovered_at = None
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._last_save = time.monotonic()
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception:
+            return False
+        if data.get("media_type") != self.media_type:
+            return False
+        self.feeds = data.get("feeds", {})
+        self.discovered_at = data.get("discovered_at")
+        if self.discovered_at is not None and time.time() - self.discovered_at > DISCOVERY_MAX_AGE:
+            self.restart_discovery()
+        self.completed = set(data.get("completed", []))
+        self.pending = {d["media_id"]: MediaItem.from_dict(d) for d in data.get("pending", [])}
+        return True
+
+    def feed(self, name):
+        return self.feeds.setdefault(name, {"offset": 0, "done": False})
+
+    def restart_discovery(self):
+        self.feeds = {}
+        self.discovered_at = None
+
+    def discovery_finished(self):
+        if self.discovered_at is None:
+            self.discovered_at = time.time()
+
+    def add(self, item):
+        with self._lock:
+            if item.media_id in self.pending or item.media_id in self.completed:
+                return False
+            self.pending[item.media_id] = item
+            return True
+
+    def mark_done(self, media_id):
+        with self._lock:
+            self.completed.add(media_id)
+            self.pending.pop(media_id, None)
+
+    def pending_items(self):
+        with self._lock:
+            return list(self.pending.values())
+
+    def save_if_due(self):
+        with self._lock:
+            if time.monotonic() - self._last_save < CHECKPOINT_INTERVAL:
+                return
+            self._last_save = time.monotonic()
+        self.save()
+
+    def save(self):
+        with self._save_lock:
+            with self._lock:
+                data = {
+                    "media_type": self.media_type,
+                    "feeds": json.loads(json.dumps(self.feeds)),
+                    "discovered_at": self.discovered_at,
+                    "pending": [it.to_dict() for it in self.pending.values()],
+                    "completed": list(self.completed),
+                }
+                self._last_save = time.monotonic()
+            tmp = self.path + ".tmp"
+            try:
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(data, f)
+                os.replace(tmp, self.path)
+            except Exception:
+                pass
+
+    def clear(self):
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+
 class MediaDownloader:
-    def __init__(self, session, scraper, max_workers_media=MAX_WORKERS_MEDIA, max_workers_hls=MAX_WORKERS_HLS):
+    def __init__(self, session, scraper, max_workers_media=MAX_WORKERS_MEDIA, max_workers_hls=MAX_WORKERS_HLS,
+                 max_workers_ffmpeg=MAX_WORKERS_FFMPEG, scratch_dir=SCRATCH_DIR,
+                 segmented_min_bytes=SEGMENTED_MIN_BYTES, segmented_parts=SEGMENTED_PARTS,
+                 storage_backend=STORAGE_BACKEND):
         self.session = session
         self.scraper = scraper
         self.max_workers_media = max_workers_media
         self.max_workers_hls = max_workers_hls
+        self.max_workers_ffmpeg = max_workers_ffmpeg
+        self.scratch_dir = scratch_dir
+        self.segmented_min_bytes = segmented_min_bytes
+        self.segmented_parts = segmented_parts
+        self.storage_backend = storage_backend
+        self._hedge = HedgePolicy()
+        self._hedge_pool = None
         self._pbar_lock = threading.Lock()
-
-    def download_file(self, url, filename, is_video=False, file_id=None, is_image=False, use_original_url=False):
+        self._remux = None
+        self._disk = None
+        self._manifest = None
+        self._pack = None
+        self._bytes_done = 0
+        self._stats_lock = threading.Lock()
+
+    def _build_request(self, url, is_video=False, file_id=None, is_image=False, use_original_url=False):
         self.scraper.refresh_token_if_needed()
         headers = {"Referer": "https://privacy.com.br/", "Origin": "https://privacy.com.br"}
         final_url = url
@@ -442,13 +1253,13 @@ class MediaDownloader:
                 })
             else:
                 if '/hls/' not in final_url:
-                    return False
+                    return None
                 if not file_id:
                     file_id = self.extract_file_id_from_url(final_url)
                 content_uri_part = final_url.split('/hls/', 1)[1]
                 token_data = self.scraper.get_video_token(file_id)
                 if not token_data:
-                    return False
+                    return None
                 headers.update({
                     "Host": "video.privacy.com.br",
                     "Connection": "keep-alive",
@@ -467,37 +1278,241 @@ class MediaDownloader:
                     "Sec-Fetch-Dest": "empty",
                     "Accept-Encoding": "gzip, deflate, br, zstd"
                 })
+        return final_url, headers
+
+    def download_file(self, url, filename, is_video=False, file_id=None, is_image=False, use_original_url=False,
+                      reservation=None):
+        request = self._build_request(url, is_video, file_id, is_image, use_original_url)
+        if request is None:
+            return False
+        final_url, headers = request
 
         target_dir = os.path.dirname(os.path.abspath(filename))
         if target_dir:
             os.makedirs(target_dir, exist_ok=True)
 
+        part = filename + PART_SUFFIX
+
+        if is_video and '.mp4' in final_url and self.segmented_parts > 1:
+            total = self._probe_length(final_url, headers)
+            if total and total >= self.segmented_min_bytes:
+                if reservation is not None:
+                    reservation.expect(total)
+                if self._download_segmented(final_url, headers, part, total, reservation):
+                    os.replace(part, filename)
+                    return True
+
+        with TRACER.span("download_file", video=is_video):
+            if is_video:
+                winner = part if self._fetch_to_file(final_url, headers, part, reservation) else None
+            else:
+                winner = self._hedged_fetch(final_url, headers, part, reservation)
+        if winner:
+            os.replace(winner, filename)
+            return True
         try:
-            response = self.session.get(final_url, headers=headers, impersonate="chrome120", stream=True)
+            os.remove(part)
+        except OSError:
+            pass
+        return False
+
+    def _fetch_to_file(self, url, headers, path, reservation=None, cancel=None):
+        try:
+            response = self.session.get(url, headers=headers, impersonate="chrome120", stream=True)
             if response.status_code in (200, 206):
-                with open(filename, 'wb') as f:
+                content_length = int(response.headers.get("Content-Length") or 0)
+                if reservation is not None:
+                    reservation.expect(content_length)
+                written = 0
+                with open(path, 'wb') as f:
                     for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        if cancel is not None and cancel.is_set():
+                            response.close()
+                            return False
                         if chunk:
                             f.write(chunk)
-                return True
+                            written += len(chunk)
+                            if reservation is not None:
+                                reservation.written(len(chunk))
+                encoding = response.headers.get("Content-Encoding", "identity")
+                return not content_length or encoding != "identity" or written == content_length
             return False
         except Exception:
+            if cancel is not None and cancel.is_set():
+                return False
             try:
-                response = self.session.get(final_url, headers=headers, impersonate="chrome120")
+                response = self.session.get(url, headers=headers, impersonate="chrome120")
                 if response.status_code in (200, 206):
-                    with open(filename, 'wb') as f:
+                    with open(path, 'wb') as f:
                         f.write(response.content)
                     return True
             except Exception:
                 pass
             return False
 
+    def _hedged_fetch(self, url, headers, path, reservation=None):
+        policy = self._hedge
+        host = urllib.parse.urlsplit(url).netloc
+        delay = policy.delay(host)
+        started = time.monotonic()
+        if delay is None:
+            if not self._fetch_to_file(url, headers, path, reservation):
+                return None
+            policy.observe(host, time.monotonic() - started)
+            return path
+
+        with self._stats_lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(
+                    max_workers=2 * self.max_workers_media * (self.max_workers_hls + 1))
+            pool = self._hedge_pool
+
+        cancel_hedge = threading.Event()
+        state = {"winner": None, "pending": 1, "primary_done": False, "faster": False}
+        lock = threading.Lock()
+        done = threading.Event()
+
+        def attempt(name, target):
+            attempt_started = time.monotonic()
+            if name == "primary":
+                ok = self._fetch_to_file(url, headers, target, reservation)
+            else:
+                ok = self._fetch_to_file(url, headers, target, cancel=cancel_hedge)
+            elapsed = time.monotonic() - attempt_started
+            with lock:
+                state["pending"] -= 1
+                won = ok and state["winner"] is None
+                if won:
+                    state["winner"] = target
+                    if name == "primary":
+                        cancel_hedge.set()
+                    else:
+                        state["faster"] = not state["primary_done"]
+                if name == "primary":
+                    state["primary_done"] = True
+                if won or not state["pending"]:
+                    done.set()
+            if name == "primary" and ok:
+                policy.observe(host, elapsed)
+            if not won and os.path.exists(target):
+                try:
+                    os.remove(target)
+                except OSError:
+                    pass
+
+        pool.submit(TRACER.wrap(attempt, "hedge.primary"), "primary", path)
+        if not done.wait(delay):
+            with lock:
+                launch = state["winner"] is None and state["pending"] and policy.try_hedge()
+                if launch:
+                    state["pending"] += 1
+            if launch:
+                pool.submit(TRACER.wrap(attempt, "hedge", host=host), "hedge", path + HEDGE_SUFFIX)
+            done.wait()
+        with lock:
+            winner, faster = state["winner"], state["faster"]
+        if faster:
+            policy.hedge_won()
+        return winner
+
+    def _fetch_text(self, url, file_id=None):
+        request = self._build_request(url, is_video=True, file_id=file_id)
+        if request is None:
+            return None
+        final_url, headers = request
+        try:
+            response = self.session.get(final_url, headers=headers, impersonate="chrome120")
+        except Exception:
+            return None
+        return response.text if response.status_code == 200 else None
+
+    def _probe_item(self, item):
+        try:
+            if item.kind == "image":
+                request = self._build_request(item.url, is_image=True)
+            elif not item.is_hls:
+                request = self._build_request(item.url, is_video=True)
+            else:
+                master = self._fetch_text(item.url, item.file_id)
+                if not master:
+                    return None
+                best_url, bandwidth = self._best_variant(item.url, master)
+                variant = self._fetch_text(best_url, item.file_id) if best_url else None
+                return self._estimate_hls_bytes(variant, bandwidth) if variant else None
+            return self._probe_length(*request, allow_200=True) if request else None
+        except Exception:
+            return None
+
+    def _probe_length(self, url, headers, allow_200=False):
+        try:
+            response = self.session.get(url, headers=dict(headers, Range="bytes=0-0"),
+                                        impersonate="chrome120", stream=True)
+        except Exception:
+            return None
+        try:
+            if response.status_code == 206:
+                m = re.match(r'bytes\s+0-0/(\d+)', response.headers.get("Content-Range", ""))
+                return int(m.group(1)) if m else None
+            if allow_200 and response.status_code == 200:
+                return int(response.headers.get("Content-Length") or 0) or None
+            return None
+        finally:
+            response.close()
+
+    def _download_part(self, url, headers, filename, start, end, reservation=None):
+        response = self.session.get(url, headers=dict(headers, Range=f"bytes={start}-{end}"),
+                                    impersonate="chrome120", stream=True)
+        try:
+            if response.status_code != 206:
+                return False
+            expected = end - start + 1
+            written = 0
+            with open(filename, 'r+b') as f:
+                f.seek(start)
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    if not chunk:
+                        continue
+                    written += len(chunk)
+                    if written > expected:
+                        return False
+                    f.write(chunk)
+                    if reservation is not None:
+                        reservation.written(len(chunk))
+            return written == expected
+        finally:
+            response.close()
+
+    def _download_segmented(self, url, headers, filename, total, reservation=None):
+        part_size = -(-total // self.segmented_parts)
+        ranges = [(start, min(start + part_size, total) - 1) for start in range(0, total, part_size)]
+        try:
+            with open(filename, 'wb') as f:
+                f.truncate(total)
+            with TRACER.span("segmented", parts=len(ranges), bytes=total), \
+                    ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+                fetch_part = TRACER.wrap(self._download_part, "segmented.part")
+                futures = [pool.submit(fetch_part, url, headers, filename, start, end, reservation)
+                           for start, end in ranges]
+                ok = all(f.result() for f in futures)
+            if ok and os.path.getsize(filename) == total:
+                return True
+        except Exception:
+            pass
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+        return False
+
     def download_image_with_fallback(self, url, filename):
         if self.download_file(url, filename, is_image=True, use_original_url=False):
             return True
         return self.download_file(url, filename, is_image=True, use_original_url=True)
 
     def get_best_quality_m3u8(self, main_m3u8_url, main_m3u8_content):
+        return self._best_variant(main_m3u8_url, main_m3u8_content)[0]
+
+    def _best_variant(self, main_m3u8_url, main_m3u8_content):
         best_quality_url, max_bandwidth, current_bandwidth = None, 0, 0
         for line in main_m3u8_content.split('\n'):
             if line.startswith('#EXT-X-STREAM-INF'):
@@ -508,9 +1523,23 @@ class MediaDownloader:
                 if current_bandwidth > max_bandwidth:
                     max_bandwidth = current_bandwidth
                     best_quality_url = urllib.parse.urljoin(main_m3u8_url, line.strip())
-        return best_quality_url
+        return best_quality_url, max_bandwidth
 
-    def process_m3u8(self, m3u8_url, base_path, file_id=None):
+    def _estimate_hls_bytes(self, content, bandwidth):
+        segments, duration = 0, 0.0
+        for line in content.split('\n'):
+            if line.startswith('#EXTINF:'):
+                try:
+                    duration += float(line[len('#EXTINF:'):].split(',', 1)[0])
+                except ValueError:
+                    pass
+            elif line.strip() and not line.startswith('#'):
+                segments += 1
+        if bandwidth and duration:
+            return int(bandwidth / 8 * duration)
+        return segments * DEFAULT_SEGMENT_BYTES
+
+    def process_m3u8(self, m3u8_url, base_path, file_id=None, bandwidth=0, reservation=None):
         m3u8_filename = os.path.join(base_path, "playlist.m3u8")
         if not self.download_file(m3u8_url, m3u8_filename, is_video=True, file_id=file_id):
             return None
@@ -518,6 +1547,9 @@ class MediaDownloader:
         with open(m3u8_filename, 'r', encoding='utf-8') as f:
             content = f.read()
 
+        if reservation is not None:
+            reservation.expect(self._estimate_hls_bytes(content, bandwidth) * 2)
+
         modified_content = []
         key_tasks = []
         segment_tasks = []
@@ -541,17 +1573,22 @@ class MediaDownloader:
             else:
                 modified_content.append(line)
 
-        for key_url, key_path in key_tasks:
-            self.download_file(key_url, key_path, file_id=file_id)
+        with TRACER.span("hls.keys", count=len(key_tasks)):
+            for key_url, key_path in key_tasks:
+                self.download_file(key_url, key_path, file_id=file_id)
 
+        segment_tasks = [(url, path) for url, path in segment_tasks if not os.path.exists(path)]
         if segment_tasks:
-            with ThreadPoolExecutor(max_workers=self.max_workers_hls) as pool:
-                futures = [
-                    pool.submit(self.download_file, url, path, is_video=False, file_id=file_id)
+            with TRACER.span("hls.segments", count=len(segment_tasks)), \
+                    ThreadPoolExecutor(max_workers=self.max_workers_hls) as pool:
+                fetch_segment = TRACER.wrap(self.download_file, "hls.segment")
+                futures = {
+                    pool.submit(fetch_segment, url, path, is_video=False, file_id=file_id): path
                     for url, path in segment_tasks
-                ]
-                for _ in as_completed(futures):
-                    pass
+                }
+                for future in as_completed(futures):
+                    if reservation is not None and os.path.exists(futures[future]):
+                        reservation.written(os.path.getsize(futures[future]))
 
         with open(m3u8_filename, 'w', encoding='utf-8') as f:
             f.write('\n'.join(modified_content))
@@ -564,17 +1601,34 @@ class MediaDownloader:
             output_dir = os.path.dirname(output_file)
             if output_dir:
                 os.makedirs(output_dir, exist_ok=True)
+            part = output_file + PART_SUFFIX
             result = subprocess.run(
                 ["ffmpeg", "-allowed_extensions", "ALL", "-i", input_file,
-                "-c:v", "copy", "-c:a", "copy", "-y", output_file],
+                "-c:v", "copy", "-c:a", "copy", "-f", "mp4", "-y", part],
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL
             )
-            return result.returncode == 0
+            if result.returncode != 0:
+                if os.path.exists(part):
+                    os.remove(part)
+                return False
+            os.replace(part, output_file)
+            return True
         except Exception as e:
             tqdm.write(f"\nErro na conversão: {e}")
             return False
 
+    def _remux_and_clean(self, input_file, output_file, base_path, reservation=None):
+        try:
+            ok = self.convert_m3u8_to_mp4(input_file, output_file)
+            if ok:
+                self._record(output_file)
+            return ok
+        finally:
+            self.clean_temp_files(base_path)
+            if reservation is not None:
+                reservation.release()
+
     def clean_temp_files(self, base_path):
         try:
             shutil.rmtree(base_path)
@@ -591,10 +1645,34 @@ class MediaDownloader:
             return str(uuid.uuid4())
         return media_id
 
-    def _download_hls_video(self, file_url, filename):
-        file_id = self.extract_file_id_from_url(file_url)
-        base_path = os.path.join(os.path.dirname(filename), f"{uuid.uuid4()}_temp")
+    def _scratch_root(self, profile_name):
+        if self.scratch_dir:
+            return os.path.join(self.scratch_dir, profile_name)
+        return f"./{profile_name}/videos"
+
+    def _clean_stale_files(self, profile_name, keep_ids):
+        root = self._scratch_root(profile_name)
+        for folder in dict.fromkeys([root, f"./{profile_name}/videos", f"./{profile_name}/fotos"]):
+            if not os.path.isdir(folder):
+                continue
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_dir() and entry.name.endswith("_temp"):
+                        if folder != root or entry.name[:-len("_temp")] not in keep_ids:
+                            self.clean_temp_files(entry.path)
+                    elif entry.is_file() and entry.name.endswith((PART_SUFFIX, PART_SUFFIX + HEDGE_SUFFIX, PACK_TEMP_SUFFIX)):
+                        try:
+                            os.remove(entry.path)
+                        except OSError:
+                            pass
+
+    def _download_hls_video(self, file_url, filename, reservation=None, file_id=None, base_path=None):
+        if not file_id:
+            file_id = self.extract_file_id_from_url(file_url)
+        if base_path is None:
+            base_path = os.path.join(self.scratch_dir or os.path.dirname(filename), f"{uuid.uuid4()}_temp")
         os.makedirs(base_path, exist_ok=True)
+        handed_off = False
 
         try:
             main_m3u8 = os.path.join(base_path, "main.m3u8")
@@ -602,70 +1680,132 @@ class MediaDownloader:
                 return False
             with open(main_m3u8, 'r', encoding='utf-8') as f:
                 content = f.read()
-            best_url = self.get_best_quality_m3u8(file_url, content)
+            best_url, bandwidth = self._best_variant(file_url, content)
             if not best_url:
                 return False
-            best_m3u8 = self.process_m3u8(best_url, base_path, file_id)
-            if best_m3u8 and os.path.exists(best_m3u8):
-                return self.convert_m3u8_to_mp4(best_m3u8, filename)
+            best_m3u8 = self.process_m3u8(best_url, base_path, file_id, bandwidth, reservation)
+            if not best_m3u8 or not os.path.exists(best_m3u8):
+                return False
+            if self._remux is None:
+                ok = self.convert_m3u8_to_mp4(best_m3u8, filename)
+                if ok:
+                    self._record(filename)
+                return ok
+            handed_off = True
+            return self._remux.submit(self._remux_and_clean, best_m3u8, filename, base_path, reservation)
+        finally:
+            if not handed_off:
+                self.clean_temp_files(base_path)
+                if reservation is not None:
+                    reservation.release()
+
+    def _expected_cost(self, item):
+        if item.expected_size:
+            return item.expected_size
+        if item.kind == "image":
+            return ESTIMATED_IMAGE_BYTES
+        if item.is_hls:
+            return ESTIMATED_HLS_BYTES
+        return ESTIMATED_MP4_BYTES
+
+    def _download_image_to_pack(self, item, profile_name):
+        if item.media_id in self._pack:
+            return False
+        temp = os.path.join(self._scratch_root(profile_name), item.media_id + PACK_TEMP_SUFFIX)
+        if not self.download_image_with_fallback(item.url, temp):
             return False
+        try:
+            self._pack.append(item.media_id, temp)
+            self._count_bytes(os.path.getsize(temp))
         finally:
-            self.clean_temp_files(base_path)
+            os.remove(temp)
+        return True
 
-    def _download_single_media(self, file_data, profile_name, media_type):
-        if file_data.get("isLocked", True):
-            return (None, False)
-        file_type = file_data.get("type", "")
-        file_url = file_data.get("url", "")
-        media_id = self.ensure_media_id(file_data.get("mediaId"))
+    def _count_bytes(self, n):
+        with self._stats_lock:
+            self._bytes_done += n
 
-        if file_type == "image" and media_type in ["1", "3"]:
+    def _record(self, filename):
+        try:
+            self._count_bytes(os.path.getsize(filename))
+        except OSError:
+            pass
+        if self._manifest is not None:
+            self._manifest.record(filename)
+
+    def _download_single_media(self, item, profile_name):
+        media_id = item.media_id
+
+        if item.kind == "image":
             filename = f"./{profile_name}/fotos/{media_id}.jpg"
             if os.path.exists(filename):
                 return ("photo", False)
-            ok = self.download_image_with_fallback(file_url, filename)
+            if self._pack is not None:
+                return ("photo", self._download_image_to_pack(item, profile_name))
+            ok = self.download_image_with_fallback(item.url, filename)
+            if ok:
+                self._record(filename)
             return ("photo", ok)
 
-        if file_type == "video" and media_type in ["2", "3"]:
+        if item.kind == "video":
             filename = f"./{profile_name}/videos/{media_id}.mp4"
             if os.path.exists(filename):
                 return ("video", False)
-            if '.mp4' in file_url:
-                ok = self.download_file(file_url, filename, is_video=True)
-            else:
-                ok = self._download_hls_video(file_url, filename)
+            reservation = None
+            if self._disk is not None:
+                reservation = self._disk.admit(self._expected_cost(item))
+                if reservation is None:
+                    tqdm.write(f"{RED}Espaço em disco insuficiente, vídeo {media_id} ignorado{RESET}")
+                    return ("video", False)
+            if item.is_hls:
+                base_path = os.path.join(self._scratch_root(profile_name), f"{media_id}_temp")
+                return ("video", self._download_hls_video(item.url, filename, reservation, item.file_id, base_path))
+            try:
+                ok = self.download_file(item.url, filename, is_video=True, reservation=reservation)
+            finally:
+                if reservation is not None:
+                    reservation.release()
+            if ok:
+                self._record(filename)
             return ("video", ok)
 
         return (None, False)
 
-    def _collect_eligible(self, files, media_type):
+    def _collect_eligible(self, files, media_type, source):
         for f in files:
             if f.get("isLocked", True):
                 continue
             ft = f.get("type", "")
-            if ft == "image" and media_type in ["1", "3"]:
-                yield f
-            elif ft == "video" and media_type in ["2", "3"]:
-                yield f
+            wanted = (ft == "image" and media_type in ["1", "3"]) or (ft == "video" and media_type in ["2", "3"])
+            if not wanted:
+                continue
+            url = f.get("url", "")
+            yield MediaItem(
+                self.ensure_media_id(f.get("mediaId")),
+                ft,
+                url,
+                self.extract_file_id_from_url(url),
+                source,
+            )
 
-    def _discover(self, iterator, discover_label):
+    def _discover(self, iterator, discover_label, checkpoint=None):
         items = []
-        with tqdm(
+        with TRACER.span("discover", label=discover_label), tqdm(
             total=0,
             desc=discover_label,
             bar_format="{desc}: {n} encontradas",
             leave=False,
         ) as d:
             for it in iterator:
+                if checkpoint is not None:
+                    if not checkpoint.add(it):
+                        continue
+                    checkpoint.save_if_due()
                 items.append(it)
                 d.update(1)
         return items
 
-    def _drain(self, iterator, profile_name, media_type, pbar, discover_label):
-        os.makedirs(f"./{profile_name}/fotos", exist_ok=True)
-        os.makedirs(f"./{profile_name}/videos", exist_ok=True)
-
-        items = self._discover(iterator, discover_label)
+    def _run_items(self, items, profile_name, pbar, checkpoint=None):
         if not items:
             return 0, 0
 
@@ -677,135 +1817,345 @@ class MediaDownloader:
         counters = {"photos": 0, "videos": 0}
         counter_lock = threading.Lock()
 
+        def finish(item, kind, ok):
+            if pbar is not None:
+                with self._pbar_lock:
+                    pbar.update(1)
+            if ok and kind in ("photo", "video"):
+                with counter_lock:
+                    counters[f"{kind}s"] += 1
+            if checkpoint is not None:
+                if ok:
+                    checkpoint.mark_done(item.media_id)
+                checkpoint.save_if_due()
+
+        def finish_remux(item, kind, future):
+            try:
+                ok = future.result()
+            except Exception as e:
+                tqdm.write(f"{RED}Erro na conversão: {e}{RESET}")
+                ok = False
+            finish(item, kind, ok)
+
         def task(item):
             try:
-                return self._download_single_media(item, profile_name, media_type)
+                kind, ok = self._download_single_media(item, profile_name)
             except Exception as e:
                 tqdm.write(f"{RED}Erro no download: {e}{RESET}")
-                return (None, False)
-
-        with ThreadPoolExecutor(max_workers=self.max_workers_media) as pool:
-            futures = [pool.submit(task, it) for it in items]
-            for f in as_completed(futures):
-                kind, ok = f.result()
-                if pbar is not None:
-                    with self._pbar_lock:
-                        pbar.update(1)
-                if ok and kind in ("photo", "video"):
-                    with counter_lock:
-                        counters[f"{kind}s"] += 1
+                kind, ok = None, False
+            if isinstance(ok, Future):
+                ok.add_done_callback(lambda fut: finish_remux(item, kind, fut))
+            else:
+                finish(item, kind, ok)
+
+        if self.scratch_dir:
+            os.makedirs(self.scratch_dir, exist_ok=True)
+        self._remux = RemuxPool(self.max_workers_ffmpeg)
+        self._disk = DiskBudget([self.scratch_dir, f"./{profile_name}"])
+        self._manifest = LibraryManifest(profile_name)
+        self._manifest.load()
+        if self.storage_backend == "pack":
+            self._pack = PackStore(profile_name).load()
+        self._bytes_done = 0
+        started = time.monotonic()
+        try:
+            with TRACER.span("run", profile=profile_name, items=len(items)):
+                scheduler = PriorityScheduler(items, self._expected_cost, self.max_workers_media)
+                scheduler.run(TRACER.wrap(task, "media"))
+        finally:
+            self._disk = None
+            remux, self._remux = self._remux, None
+            remux.shutdown()
+            if remux.completed:
+                tqdm.write(remux.summary())
+            if self._hedge.hedges:
+                tqdm.write(self._hedge.summary())
+            manifest, self._manifest = self._manifest, None
+            manifest.save()
+            if self._pack is not None:
+                self._pack.sync()
+            self._pack = None
+            if self._bytes_done:
+                ThroughputLog().record(self._bytes_done, time.monotonic() - started)
 
         return counters["photos"], counters["videos"]
 
-    def _iter_profile_media(self, profile_name, media_type):
-        offset, limit = 0, 20
+    def _run_job(self, job_name, feeds, profile_name, media_type, pbar):
+        os.makedirs(f"./{profile_name}/fotos", exist_ok=True)
+        os.makedirs(f"./{profile_name}/videos", exist_ok=True)
+
+        checkpoint = JobCheckpoint(profile_name, job_name, media_type)
+        if checkpoint.load():
+            tqdm.write(f"{GREEN}Retomando tarefa interrompida "
+                       f"({len(checkpoint.pending)} mídias pendentes, {len(checkpoint.completed)} concluídas)...{RESET}")
+        self._clean_stale_files(profile_name, set(checkpoint.pending))
+
+        finished = False
+        try:
+            for feed in feeds:
+                iterate, label = self._feeds[feed]
+                self._discover(iterate(profile_name, media_type, checkpoint.feed(feed)), label, checkpoint)
+            checkpoint.discovery_finished()
+            checkpoint.save()
+            result = self._run_items(checkpoint.pending_items(), profile_name, pbar, checkpoint)
+            finished = True
+            return result
+        finally:
+            if finished:
+                checkpoint.clear()
+            else:
+                checkpoint.save()
+
+    @property
+    def _feeds(self):
+        return {
+            "profile": (self._iter_profile_media, "Descobrindo mídias do perfil"),
+            "purchased": (self._iter_purchased_media, "Descobrindo mídias compradas"),
+            "chat": (self._iter_chat_media, "Descobrindo mídias do chat"),
+        }
+
+    def _iter_profile_media(self, profile_name, media_type, state=None):
+        state = state if state is not None else {}
+        if state.get("done"):
+            return
+        offset, limit = state.get("offset", 0), 20
         while True:
             self.scraper.refresh_token_if_needed()
-            media_data = self.scraper.get_profile_posts(profile_name, offset, limit)
+            with TRACER.span("feed.page", feed="profile", offset=offset):
+                media_data = self.scraper.get_profile_posts(profile_name, offset, limit)
             if not media_data or not media_data.get("items"):
                 break
             for post in media_data["items"]:
-                yield from self._collect_eligible(post.get("medias", []), media_type)
+                yield from self._collect_eligible(post.get("medias", []), media_type, "profile")
             if len(media_data["items"]) < limit:
                 break
             offset += limit
+            state["offset"] = offset
+        state["done"] = True
 
-    def _iter_purchased_media(self, profile_name, media_type):
-        offset, limit = 0, 20
+    def _iter_purchased_media(self, profile_name, media_type, state=None):
+        state = state if state is not None else {}
+        if state.get("done"):
+            return
+        offset, limit = state.get("offset", 0), 20
         while True:
             self.scraper.refresh_token_if_needed()
-            media_data = self.scraper.get_purchased_media(offset, limit)
+            with TRACER.span("feed.page", feed="purchased", offset=offset):
+                media_data = self.scraper.get_purchased_media(offset, limit)
             if not media_data or not media_data.get("items"):
                 break
             for post in media_data["items"]:
                 if post.get("creator", {}).get("profileName") != profile_name:
                     continue
-                yield from self._collect_eligible(post.get("medias", []), media_type)
+                yield from self._collect_eligible(post.get("medias", []), media_type, "purchased")
             if len(media_data["items"]) < limit:
                 break
             offset += limit
+            state["offset"] = offset
+        state["done"] = True
 
-    def _iter_chat_media(self, profile_name, media_type):
-        offset, limit = 0, 20
+    def _iter_chat_media(self, profile_name, media_type, state=None):
+        state = state if state is not None else {}
+        if state.get("done"):
+            return
+        offset, limit = state.get("offset", 0), 20
         while True:
             self.scraper.refresh_token_if_needed()
-            media_data = self.scraper.get_chat_media(offset, limit)
+            with TRACER.span("feed.page", feed="chat", offset=offset):
+                media_data = self.scraper.get_chat_media(offset, limit)
             if not media_data or not media_data.get("items"):
                 break
             for chat in media_data["items"]:
                 if chat.get("creator", {}).get("profileName") != profile_name:
                     continue
                 files = chat.get("files") or chat.get("medias") or []
-                yield from self._collect_eligible(files, media_type)
+                yield from self._collect_eligible(files, media_type, "chat")
             if len(media_data["items"]) < limit:
                 break
             offset += limit
+            state["offset"] = offset
+        state["done"] = True
 
     def download_profile_media(self, profile_name, media_type="3", pbar=None):
-        return self._drain(
-            self._iter_profile_media(profile_name, media_type),
-            profile_name, media_type, pbar, "Descobrindo mídias do perfil"
-        )
+        return self._run_job("profile", ["profile"], profile_name, media_type, pbar)
 
     def download_purchased_media_for_profile(self, profile_name, media_type="3", pbar=None):
-        return self._drain(
-            self._iter_purchased_media(profile_name, media_type),
-            profile_name, media_type, pbar, "Descobrindo mídias compradas"
-        )
+        return self._run_job("purchased", ["purchased"], profile_name, media_type, pbar)
 
     def download_chat_media_for_profile(self, profile_name, media_type="3", pbar=None):
-        return self._drain(
-            self._iter_chat_media(profile_name, media_type),
-            profile_name, media_type, pbar, "Descobrindo mídias do chat"
-        )
+        return self._run_job("chat", ["chat"], profile_name, media_type, pbar)
+
+    def _discover_all(self, profile_name, media_type):
+        items = {}
+        for iterate, label in self._feeds.values():
+            for it in self._discover(iterate(profile_name, media_type), label):
+                items.setdefault(it.media_id, it)
+        return list(items.values())
 
     def download_all(self, profile_name, media_type="3", pbar=None):
+        return self._run_job("all", ["profile", "purchased", "chat"], profile_name, media_type, pbar)
+
+    def _is_present(self, item, profile_name, pack):
+        if item.kind == "image":
+            return item.media_id in pack or os.path.exists(f"./{profile_name}/fotos/{item.media_id}.jpg")
+        return os.path.exists(f"./{profile_name}/videos/{item.media_id}.mp4")
+
+    def plan(self, profile_name, media_type="3"):
         os.makedirs(f"./{profile_name}/fotos", exist_ok=True)
         os.makedirs(f"./{profile_name}/videos", exist_ok=True)
 
-        items = self._discover(
-            self._iter_profile_media(profile_name, media_type),
-            "Descobrindo mídias do perfil",
-        )
-        items += self._discover(
-            self._iter_purchased_media(profile_name, media_type),
-            "Descobrindo mídias compradas",
-        )
-        items += self._discover(
-            self._iter_chat_media(profile_name, media_type),
-            "Descobrindo mídias do chat",
-        )
+        checkpoint = JobCheckpoint(profile_name, "all", media_type)
+        checkpoint.load()
+        checkpoint.restart_discovery()
+        try:
+            for feed in ("profile", "purchased", "chat"):
+                iterate, label = self._feeds[feed]
+                self._discover(iterate(profile_name, media_type, checkpoint.feed(feed)), label, checkpoint)
+            checkpoint.discovery_finished()
+        finally:
+            checkpoint.save()
+
+        pack = PackStore(profile_name).load()
+        items = checkpoint.pending_items()
+        missing = [it for it in items if not self._is_present(it, profile_name, pack)]
+        to_probe = [it for it in missing if not it.expected_size]
+        with TRACER.span("plan.probe", items=len(to_probe)), \
+                tqdm(total=len(to_probe), desc="Estimando tamanhos", bar_format=TQDM_FORMAT, leave=False) as pbar, \
+                ThreadPoolExecutor(max_workers=self.max_workers_media) as pool:
+            for item, size in zip(to_probe, pool.map(self._probe_item, to_probe)):
+                item.expected_size = size
+                pbar.update(1)
+        checkpoint.save()
+
+        sources = {}
+        for item in missing:
+            counts = sources.setdefault(item.source, {"photos": 0, "videos": 0})
+            counts["photos" if item.kind == "image" else "videos"] += 1
+        total_bytes = sum(self._expected_cost(it) for it in missing)
+        rate = ThroughputLog().bytes_per_second()
+        return {
+            "profile": profile_name,
+            "discovered": len(items),
+            "present": len(items) - len(missing),
+            "photos": sum(c["photos"] for c in sources.values()),
+            "videos": sum(c["videos"] for c in sources.values()),
+            "sources": sources,
+            "bytes": total_bytes,
+            "unknown": sum(1 for it in missing if not it.expected_size),
+            "eta": total_bytes / rate if rate else None,
+        }
 
-        if not items:
+    def _remote_size_lookup(self, items):
+        by_id = {item.media_id: item for item in items if not item.is_hls}
+
+        def remote_size(path):
+            item = by_id.get(os.path.splitext(os.path.basename(path))[0])
+            if item is None:
+                return None
+            return item.expected_size or self._probe_item(item)
+        return remote_size
+
+    def verify_library(self, profile_name, remote_size=None):
+        manifest = LibraryManifest(profile_name)
+        manifest.load()
+        pack = PackStore(profile_name).load()
+        verifier = LibraryVerifier(profile_name, manifest, pack=pack, remote_size=remote_size)
+        checked, bad = verifier.run()
+        quarantined = {}
+        for path, reason in bad:
+            tqdm.write(f"{RED}Corrompido: {path} ({reason}){RESET}")
+            try:
+                os.replace(path, path + CORRUPT_SUFFIX)
+            except OSError:
+                continue
+            manifest.forget(path)
+            quarantined[os.path.splitext(os.path.basename(path))[0]] = ("file", path)
+        manifest.save()
+        if pack.exists():
+            packed, bad_packed = verifier.run_pack()
+            checked += packed
+            for media_id, reason in bad_packed:
+                tqdm.write(f"{RED}Corrompido no pack: {media_id} ({reason}){RESET}")
+                quarantined[media_id] = ("pack", pack.index[media_id])
+                pack.forget(media_id)
+            pack.sync()
+        return checked, quarantined
+
+    def _finish_repair(self, profile_name, quarantined):
+        pack = PackStore(profile_name).load()
+        restored = 0
+        for media_id, (where, detail) in quarantined.items():
+            if where == "file":
+                corrupt = detail + CORRUPT_SUFFIX
+                if os.path.exists(detail) or media_id in pack:
+                    os.remove(corrupt)
+                else:
+                    os.replace(corrupt, detail)
+                    restored += 1
+            elif media_id not in pack:
+                pack.restore(media_id, *detail)
+                restored += 1
+        pack.sync()
+        if restored:
+            tqdm.write(f"{RED}{restored} arquivo(s) não puderam ser baixados novamente; "
+                       f"os originais foram mantidos{RESET}")
+
+    def export_pack(self, profile_name, dest_dir=None):
+        pack = PackStore(profile_name).load()
+        if not pack.exists():
+            return None
+        return pack.export(dest_dir or f"./{profile_name}/fotos_export")
+
+    def repair_library(self, profile_name, pbar=None):
+        discovered = None
+        remote_size = None
+        if VERIFY_REMOTE_SIZE:
+            discovered = self._discover_all(profile_name, "3")
+            remote_size = self._remote_size_lookup(discovered)
+        checked, quarantined = self.verify_library(profile_name, remote_size)
+        tqdm.write(f"Arquivos verificados: {checked}, corrompidos: {len(quarantined)}")
+        if not quarantined:
             return 0, 0
+        try:
+            if discovered is None:
+                discovered = self._discover_all(profile_name, "3")
+            items = [it for it in discovered if it.media_id in quarantined]
+            missing = len(quarantined) - len(items)
+            if missing:
+                tqdm.write(f"{RED}{missing} arquivo(s) corrompido(s) não encontrados nos feeds{RESET}")
+            return self._run_items(items, profile_name, pbar)
+        finally:
+            self._finish_repair(profile_name, quarantined)
 
-        if pbar is not None:
-            with self._pbar_lock:
-                pbar.total = (pbar.total or 0) + len(items)
-                pbar.refresh()
 
-        counters = {"photos": 0, "videos": 0}
-        counter_lock = threading.Lock()
+def format_bytes(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
 
-        def task(item):
-            try:
-                return self._download_single_media(item, profile_name, media_type)
-            except Exception as e:
-                tqdm.write(f"{RED}Erro no download: {e}{RESET}")
-                return (None, False)
-
-        with ThreadPoolExecutor(max_workers=self.max_workers_media) as pool:
-            futures = [pool.submit(task, it) for it in items]
-            for f in as_completed(futures):
-                kind, ok = f.result()
-                if pbar is not None:
-                    with self._pbar_lock:
-                        pbar.update(1)
-                if ok and kind in ("photo", "video"):
-                    with counter_lock:
-                        counters[f"{kind}s"] += 1
 
-        return counters["photos"], counters["videos"]
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s"
+
+
+def print_plan(plan):
+    labels = {"profile": "Perfil", "purchased": "Compradas", "chat": "Chat"}
+    print(f"\n=== PLANO - @{plan['profile']} ===")
+    print(f"Mídias encontradas: {plan['discovered']} (já baixadas: {plan['present']})")
+    for source, counts in plan["sources"].items():
+        print(f"  {labels.get(source, source)}: {counts['photos']} fotos, {counts['videos']} vídeos")
+    print(f"A baixar: {plan['photos']} fotos, {plan['videos']} vídeos")
+    print(f"Tamanho estimado: {format_bytes(plan['bytes'])}"
+          + (f" ({plan['unknown']} sem tamanho conhecido, valor aproximado)" if plan["unknown"] else ""))
+    if plan["eta"] is not None:
+        print(f"Tempo estimado: {format_duration(plan['eta'])}")
+    else:
+        print("Tempo estimado: indisponível (nenhum download medido ainda)")
+    print("A opção 4 (Baixar tudo) com o mesmo tipo de mídia reaproveita esta descoberta.")
 
 
 def select_media_type():
@@ -877,16 +2227,27 @@ def main():
             print("2 - Baixar mídias compradas")
             print("3 - Baixar mídias do chat")
             print("4 - Baixar tudo")
+            print("5 - Verificar e reparar biblioteca")
+            print("6 - Exportar fotos do pack")
+            print("7 - Planejar download (simulação)")
             print("0 - Voltar para seleção de perfil")
             action = input("Selecione uma ação: ")
 
             if action == "0":
                 break
-            if action not in ["1", "2", "3", "4"]:
+            if action not in ["1", "2", "3", "4", "5", "6", "7"]:
                 print("Opção inválida!")
                 continue
 
-            media_type = select_media_type()
+            if action == "6":
+                exported = MediaDownloader(scraper.session, scraper).export_pack(profile_name)
+                if exported is None:
+                    print("Nenhum pack encontrado para este perfil.")
+                else:
+                    print(f"{GREEN}Fotos exportadas: {exported} (./{profile_name}/fotos_export){RESET}")
+                continue
+
+            media_type = select_media_type() if action != "5" else "3"
 
             workers_media = ask_int(
                 "Threads para downloads de mídia em paralelo?",
@@ -901,19 +2262,34 @@ def main():
 
             downloader = MediaDownloader(scraper.session, scraper, workers_media, workers_hls)
 
-            with tqdm(total=0, desc=f"Download {nickname}", bar_format=TQDM_FORMAT) as pbar:
-                if action == "1":
-                    p, v = downloader.download_profile_media(profile_name, media_type, pbar)
-                    tqdm.write(f"Download concluído! Fotos: {p}, Vídeos: {v}")
-                elif action == "2":
-                    p, v = downloader.download_purchased_media_for_profile(profile_name, media_type, pbar)
-                    tqdm.write(f"Download de compras concluído! Fotos: {p}, Vídeos: {v}")
-                elif action == "3":
-                    p, v = downloader.download_chat_media_for_profile(profile_name, media_type, pbar)
-                    tqdm.write(f"Download do chat concluído! Fotos: {p}, Vídeos: {v}")
-                elif action == "4":
-                    p, v = downloader.download_all(profile_name, media_type, pbar)
-                    tqdm.write(f"Download completo! Fotos: {p}, Vídeos: {v}")
+            if action == "7":
+                print_plan(downloader.plan(profile_name, media_type))
+                TRACER.save()
+                continue
+
+            try:
+                with tqdm(total=0, desc=f"Download {nickname}", bar_format=TQDM_FORMAT) as pbar:
+                    if action == "1":
+                        p, v = downloader.download_profile_media(profile_name, media_type, pbar)
+                        tqdm.write(f"Download concluído! Fotos: {p}, Vídeos: {v}")
+                    elif action == "2":
+                        p, v = downloader.download_purchased_media_for_profile(profile_name, media_type, pbar)
+                        tqdm.write(f"Download de compras concluído! Fotos: {p}, Vídeos: {v}")
+                    elif action == "3":
+                        p, v = downloader.download_chat_media_for_profile(profile_name, media_type, pbar)
+                        tqdm.write(f"Download do chat concluído! Fotos: {p}, Vídeos: {v}")
+                    elif action == "4":
+                        p, v = downloader.download_all(profile_name, media_type, pbar)
+                        tqdm.write(f"Download completo! Fotos: {p}, Vídeos: {v}")
+                    elif action == "5":
+                        p, v = downloader.repair_library(profile_name, pbar)
+                        tqdm.write(f"Reparo concluído! Fotos: {p}, Vídeos: {v}")
+            except KeyboardInterrupt:
+                tqdm.write(f"{RED}Interrompido. O progresso foi salvo e será retomado na próxima execução.{RESET}")
+                TRACER.save()
+                scraper.turnstile.close()
+                return
+            TRACER.save()
 
     scraper.turnstile.close()
 